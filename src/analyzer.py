@@ -0,0 +1,163 @@
+from cleaner import clean_text
+from collections import OrderedDict, deque
+import threading
+
+class TermDictionary:
+    '''
+    TermDictionary gives every cleaned term a small integer id, so indexes that share the dictionary store each term
+    string once and key their posting lists on the id
+    '''
+
+    def __init__(self):
+        '''
+        Makes an empty term dictionary
+
+        Returns
+        -------
+        None.
+
+        '''
+        self._ids = {}
+        self._terms = []
+        self._lock = threading.Lock()
+
+    def term_id(self, term):
+        '''
+        returns the id of the term, giving it the next id if it is not in the dictionary yet (int)
+        '''
+        try:
+            return self._ids[term]
+        except KeyError:
+            with self._lock:
+                if term not in self._ids:
+                    self._ids[term] = len(self._terms)
+                    self._terms.append(term)
+                return self._ids[term]
+
+    def lookup(self, term):
+        '''
+        returns the id of the term, None if it is not in the dictionary (int)
+        '''
+        return self._ids.get(term)
+
+    def term(self, term_id):
+        '''
+        returns the term with the given id (str)
+        '''
+        return self._terms[term_id]
+
+    def __len__(self):
+        return len(self._terms)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+class Analyzer:
+    '''
+    Analyzer cleans text with clean_text into ids of a shared TermDictionary. The ids of recently cleaned texts are
+    cached, so a title or cast list that is in several catalogs is only cleaned once.
+    '''
+
+    def __init__(self, cache_size = 100000):
+        '''
+        Parameters
+        ----------
+        cache_size : int, optional
+            The number of cleaned texts to remember. The default is 100000.
+
+        Returns
+        -------
+        None.
+
+        '''
+        self._dictionary = TermDictionary()
+        self._cache_size = cache_size
+        self._cache = OrderedDict()
+        self._strings = {}
+        self._shares = {}         # how many times each kept string was shared and not released yet
+        self._released = deque()  # values given to release, counted off by the next share
+        self._lock = threading.Lock()
+
+    def get_dictionary(self):
+        '''
+        return the shared term dictionary (TermDictionary)
+        '''
+        return self._dictionary
+
+    def clean(self, text):
+        '''
+        returns the cleaned words of the text without adding them to the dictionary, used for search terms (list)
+        '''
+        return clean_text(text)
+
+    def analyze(self, text):
+        '''
+        Cleans the text and returns the ids of its words, adding new words to the dictionary
+
+        Parameters
+        ----------
+        text : str
+            Text to add to an index.
+
+        Returns
+        -------
+        term_ids : tuple
+            The ids of the cleaned words of the text.
+
+        '''
+        if not isinstance(text, str):
+            return tuple(self._dictionary.term_id(word) for word in clean_text(text))
+        with self._lock:
+            term_ids = self._cache.get(text)
+            if term_ids is not None:
+                self._cache.move_to_end(text)
+                return term_ids
+        term_ids = tuple(self._dictionary.term_id(word) for word in clean_text(text))
+        with self._lock:
+            self._cache[text] = term_ids
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last = False)
+        return term_ids
+
+    def share(self, value):
+        '''
+        returns the copy of a string kept by the analyzer if an equal string is shared already, so catalogs with the
+        same titles and descriptions hold one copy of them. Values that are not strings are returned as they are.
+        The analyzer forgets a string once it has been released as many times as it was shared.
+        '''
+        if not isinstance(value, str):
+            return value
+        with self._lock:
+            while len(self._released) > 0:
+                for released in self._released.popleft():
+                    if isinstance(released, str):
+                        self._shares[released] -= 1
+                        if self._shares[released] == 0:
+                            del self._shares[released]
+                            del self._strings[released]
+            shared = self._strings.setdefault(value, value)
+            self._shares[shared] = self._shares.get(shared, 0) + 1
+            return shared
+
+    def release(self, values):
+        '''
+        Gives back strings returned by share, called when the object holding them is freed. It does not take the lock
+        as it can be called by the garbage collector at any point, the strings are counted off by the next share.
+        '''
+        self._released.append(values)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
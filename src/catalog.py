@@ -0,0 +1,178 @@
+from streaming_service import StreamingService, rank_postings
+from search_results import FederatedResults
+from analyzer import Analyzer
+from show import Show
+from heapq import merge
+from itertools import count, repeat
+import threading
+import weakref
+
+MISSING = float('nan') # every missing (NaN) field of a pooled show is this one object, so the shows still match
+
+class Catalog:
+    '''
+    Catalog holds several streaming services with the same kind of show data. The services share one Analyzer, so
+    every term is stored once in a shared term dictionary, each text is cleaned once, and shows that are the same in
+    several services are the same Show object. Each service keeps its own posting lists keyed on the shared term ids.
+    The catalog only keeps a show (and its shared strings) while a service still holds it. A service of a catalog is
+    pickled together with the catalog, as it makes its shows through it.
+    '''
+
+    def __init__(self, cache_size = 100000):
+        '''
+        Parameters
+        ----------
+        cache_size : int, optional
+            The number of cleaned texts the shared analyzer remembers. The default is 100000.
+
+        Returns
+        -------
+        None.
+
+        '''
+        self._analyzer = Analyzer(cache_size)
+        self._services = {}
+        self._shows = weakref.WeakValueDictionary() # fields -> the Show the services share
+        self._lock = threading.Lock()
+
+    def get_analyzer(self):
+        '''
+        return the analyzer shared by the streaming services (Analyzer)
+        '''
+        return self._analyzer
+
+    def add_service(self, name, show_data = None, block_size = None):
+        '''
+        Makes a streaming service that shares the analyzer and the shows of the catalog
+
+        Parameters
+        ----------
+        name : str
+            name of the streaming service, it has to be unique in the catalog
+        show_data : pandas DataFrame or iterable, optional
+            The shows of the service, see StreamingService.ingest. The default is None.
+        block_size : int, optional
+            Compresses the posting lists of the service, see StreamingService. The default is None.
+
+        Raises
+        ------
+        ValueError
+            when the catalog already has a streaming service with the name
+
+        Returns
+        -------
+        service : StreamingService
+            The new streaming service.
+
+        '''
+        if name in self._services:
+            raise ValueError(f"The catalog already has a streaming service called {name}.")
+        service = StreamingService(name, show_data, block_size, self._analyzer, self._share_show)
+        self._services[name] = service
+        return service
+
+    def get_service(self, name):
+        '''
+        Get a streaming service given its name
+
+        Raises
+        ------
+        KeyError
+            if the catalog has no streaming service with the name
+
+        '''
+        try:
+            return self._services[name]
+        except KeyError:
+            raise KeyError(f"The streaming service {name} is not in the catalog.")
+
+    def get_services(self):
+        '''
+        return the names of the streaming services in the catalog (list)
+        '''
+        return list(self._services)
+
+    def _share_show(self, *fields):
+        '''
+        Makes a Show, reusing the Show of another service if every field is the same and the shared strings otherwise
+        '''
+        fields = tuple(MISSING if isinstance(field, float) and field != field else field for field in fields) # NaN != NaN, but MISSING is MISSING
+        try:
+            hash(fields)
+        except TypeError: # e.g. a list in a dict row, the show is not shared
+            return Show(*fields)
+        with self._lock:
+            show = self._shows.get(fields)
+            if show is None:
+                fields = tuple(self._analyzer.share(field) for field in fields)
+                show = Show(*fields)
+                self._shows[fields] = show
+                weakref.finalize(show, self._analyzer.release, fields) # the strings are given back when no service holds the show
+            return show
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        state['_shows'] = dict(self._shows) # weak references cannot be pickled
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+        self._shows = weakref.WeakValueDictionary()
+        for fields, show in state['_shows'].items():
+            self._shows[fields] = show
+            weakref.finalize(show, self._analyzer.release, fields)
+
+    def federated_search(self, term, services = None, unsure = False):
+        '''
+        Searches several streaming services at once to find where a show can be watched. The search term is cleaned
+        and looked up in the shared term dictionary once, and each service only ranks the index values in its posting
+        lists for those term ids. No Show is looked up until a page of the results is asked for.
+
+        Parameters
+        ----------
+        term : str
+            The string to search for.
+        services : list, optional
+            The names of the streaming services to search. The default is None and every service is searched.
+        unsure : bool, optional
+            Broadens the search range to shows with any matching words, see StreamingService.search. The default is False.
+
+        Raises
+        ------
+        KeyError
+            if a service is not in the catalog
+        ValueError
+            if none of the search phrase matches a show in any of the services
+
+        Returns
+        -------
+        matching_shows : FederatedResults
+            The (service name, show) pairs that match, the first match of every service, then the second, and so on.
+
+        '''
+        if services is None:
+            services = self.get_services()
+        snapshots = [self.get_service(name).snapshot() for name in services] # read once, like StreamingService.search
+        dictionary = self._analyzer.get_dictionary()
+        term_ids = []
+        for word in self._analyzer.clean(term):
+            term_id = dictionary.lookup(word)
+            if term_id is None or all(snapshot.get_inv_index().lookup(term_id) is None for snapshot in snapshots):
+                print(f"Excluding '{word}' from the search as no matches were found")
+                continue
+            term_ids.append(term_id)
+
+        rankings = []
+        for position, snapshot in enumerate(snapshots):
+            inv_index = snapshot.get_inv_index()
+            words_and_results = [postings for postings in (inv_index.lookup(term_id) for term_id in term_ids) if postings is not None]
+            if len(words_and_results) == 0:
+                continue
+            ranked = rank_postings(snapshot, words_and_results, unsure)
+            rankings.append(zip(count(), repeat(position), ranked)) # (rank, position of the service, index value)
+        matches = tuple((position, identity) for _, position, identity in merge(*rankings)) # ties go to the service listed first
+        if len(matches) == 0:
+            raise ValueError("None of the search phrase matches a show")
+        return FederatedResults(services, snapshots, matches)
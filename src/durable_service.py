@@ -0,0 +1,226 @@
+import streaming_service
+from show import Show
+from wal import WriteAheadLog
+from contextlib import contextmanager
+import os
+import pickle
+
+CHECKPOINT_FILE = 'checkpoint.pkl'
+LOG_FILE = 'catalog.wal'
+
+class DurableStreamingService(streaming_service.StreamingService):
+    '''
+    DurableStreamingService is a child class of StreamingService that keeps its catalog in a directory. Every published
+    batch of add_show / remove_show calls is written to a write-ahead log, and the whole catalog is written to a
+    checkpoint every checkpoint_every changes. A batch with more changes than that, such as ingest, is written
+    straight to a checkpoint instead of the log. On start up the last checkpoint is loaded and only the changes logged
+    after it are applied again, so the shows do not have to be read and cleaned again.
+    '''
+
+    def __init__(self, name, directory, show_data = None, checkpoint_every = 1000, sync_every = 32, block_size = None):
+        '''
+        Parameters
+        ----------
+        name : str
+            name of the streaming service
+        directory : str
+            The directory holding the checkpoint and the log, made if it does not exist.
+        show_data : pandas DataFrame or iterable, optional
+            The shows to start with when the directory has no checkpoint yet, see StreamingService.ingest.
+            It is ignored when a checkpoint exists. The default is None.
+        checkpoint_every : int, optional
+            The number of logged changes after which a new checkpoint is written. The default is 1000.
+        sync_every : int, optional
+            The number of logged batches after which the log is forced to disk, see WriteAheadLog. The default is 32.
+        block_size : int, optional
+            Compresses the posting lists of a new catalog, see StreamingService. The default is None.
+
+        Returns
+        -------
+        None.
+
+        '''
+        streaming_service.StreamingService.__init__(self, name, block_size = block_size)
+        os.makedirs(directory, exist_ok = True)
+        self._directory = directory
+        self._checkpoint_every = checkpoint_every
+        self._operations = []
+        self._unlogged = False # the batch is too big to log, it is checkpointed when it is published instead
+        self._since_checkpoint = 0
+        self._sequence = 0
+        self._replaying = True # nothing is logged while the catalog is restored
+        self._log = WriteAheadLog(os.path.join(directory, LOG_FILE), sync_every)
+        restored = os.path.exists(os.path.join(directory, CHECKPOINT_FILE))
+        try:
+            if restored:
+                self._load_checkpoint()
+            elif show_data is not None:
+                self.ingest(show_data)
+            self._replay()
+        finally:
+            self._replaying = False
+        if not restored and show_data is not None:
+            self.checkpoint() # the first checkpoint saves reading show_data on the next start
+
+    def _load_checkpoint(self):
+        '''
+        Loads the catalog and the log sequence number saved by checkpoint
+        '''
+        with open(os.path.join(self._directory, CHECKPOINT_FILE), 'rb') as checkpoint:
+            state = pickle.load(checkpoint)
+        self._sequence = state['sequence']
+        Show._id_counter = max(Show._id_counter, state['next_show_id']) # keep show ids unique
+        self._publish(state['snapshot'])
+
+    def _replay(self):
+        '''
+        Applies the logged batches that are newer than the checkpoint, one generation per batch
+        '''
+        for sequence, operations in self._log.records():
+            if sequence <= self._sequence:
+                continue  # already in the checkpoint, the log was not reset before a crash
+            with self.batch():
+                for operation, arguments in operations:
+                    getattr(streaming_service.StreamingService, operation)(self, *arguments)
+            self._sequence = sequence
+            self._since_checkpoint += len(operations)
+
+    @contextmanager
+    def batch(self):
+        '''
+        Groups updates into a single new generation of the catalog, see StreamingService.batch. The changes of the
+        batch are written to the log as one record just before the generation is published.
+
+        Yields
+        ------
+        self : DurableStreamingService
+            The streaming service being updated.
+
+        '''
+        with self._write_lock:
+            outer = self._pending is None
+            if outer:
+                self._operations = []
+                self._unlogged = False
+            try:
+                with streaming_service.StreamingService.batch(self):
+                    yield self
+            finally:
+                if outer:
+                    self._operations = []
+                    self._unlogged = False
+
+    def ingest(self, rows):
+        '''
+        Adds shows to the streaming service, see StreamingService.ingest. The rows are not logged, the catalog is
+        checkpointed instead when they have all been added, so only one chunk of rows is held at a time.
+        '''
+        with self.batch():
+            self._unlogged = True
+            self._operations = []
+            streaming_service.StreamingService.ingest(self, rows)
+
+    def _publish(self, snapshot):
+        '''
+        Logs the changes of the batch, publishes the generation and writes a checkpoint if enough changes were logged.
+        The changes are committed once they are logged, so a checkpoint that fails is reported rather than raised.
+        A batch too big to log is checkpointed before it is published, so nothing is published if that fails.
+        '''
+        if not self._replaying and self._unlogged:
+            self._write_checkpoint(snapshot)
+            streaming_service.StreamingService._publish(self, snapshot)
+            return
+        if not self._replaying and len(self._operations) > 0:
+            self._log.append((self._sequence + 1, self._operations)) # the sequence number is only used up once the record is written
+            self._sequence += 1
+            self._since_checkpoint += len(self._operations)
+        streaming_service.StreamingService._publish(self, snapshot)
+        if not self._replaying and self._since_checkpoint >= self._checkpoint_every:
+            try:
+                self._write_checkpoint(snapshot)
+            except (OSError, pickle.PicklingError) as error: # the changes are already logged, try again on the next publish
+                print(f"Could not write a checkpoint of {self.get_name()}, it is tried again after the next change: {error}")
+
+    def _record(self, operation, arguments):
+        '''
+        Keeps a change to log when the batch is published. Once a batch has checkpoint_every changes they are
+        dropped and the batch is checkpointed instead of logged.
+        '''
+        if self._replaying or self._unlogged:
+            return
+        self._operations.append((operation, arguments))
+        if len(self._operations) >= self._checkpoint_every:
+            self._unlogged = True
+            self._operations = []
+
+    def add_show(self, title, director, cast, country, show_type, year_added, rating, duration, genre, description):
+        '''
+        add a show to the streaming service and log it, see StreamingService.add_show
+        '''
+        with self.batch():
+            streaming_service.StreamingService.add_show(self, title, director, cast, country, show_type, year_added, rating, duration, genre, description)
+            self._record('add_show', (title, director, cast, country, show_type, year_added, rating, duration, genre, description))
+
+    def remove_show(self, show_title):
+        '''
+        remove a show from the streaming service and log it, see StreamingService.remove_show
+        '''
+        with self.batch():
+            streaming_service.StreamingService.remove_show(self, show_title)
+            self._record('remove_show', (show_title,))
+
+    def checkpoint(self):
+        '''
+        Writes the whole catalog to the checkpoint file and empties the log. The checkpoint is written to a temporary
+        file first and renamed, so a crash leaves either the old or the new checkpoint.
+
+        Returns
+        -------
+        None.
+
+        '''
+        with self._write_lock:
+            self._write_checkpoint(self._snapshot)
+
+    def _write_checkpoint(self, snapshot):
+        '''
+        Writes snapshot and the log sequence number to the checkpoint file and empties the log
+        '''
+        self._log.sync()
+        state = {'sequence': self._sequence, 'next_show_id': Show._id_counter, 'snapshot': snapshot}
+        path = os.path.join(self._directory, CHECKPOINT_FILE)
+        try:
+            with open(path + '.tmp', 'wb') as checkpoint:
+                pickle.dump(state, checkpoint, pickle.HIGHEST_PROTOCOL)
+                checkpoint.flush()
+                os.fsync(checkpoint.fileno())
+        except BaseException:
+            if os.path.exists(path + '.tmp'):
+                os.remove(path + '.tmp')
+            raise
+        os.replace(path + '.tmp', path)
+        _sync_directory(self._directory)
+        self._log.reset()
+        self._since_checkpoint = 0
+
+    def close(self):
+        '''
+        Forces the log to disk and closes it
+        '''
+        self._log.close()
+
+
+def _sync_directory(directory):
+    '''
+    Forces a rename in the directory to disk, where the operating system allows it
+    '''
+    try:
+        descriptor = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(descriptor)
+    except OSError:
+        pass
+    finally:
+        os.close(descriptor)
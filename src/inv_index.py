@@ -1,27 +1,105 @@
 from cleaner import clean_text
+from postings import CompressedPostings, PostingList, BLOCK_SIZE
+from layered_map import LayeredMap
+from itertools import chain
+import numpy as np
+import pandas as pd
 
 class InvertedIndex:
-    
+
     '''
     Creates an inveerted index
     '''
-    
-    
-    def __init__(self):
+
+
+    def __init__(self, analyzer = None):
         '''
         Makes an empty inverted index
 
+        Parameters
+        ----------
+        analyzer : Analyzer, optional
+            A shared analyzer, the posting lists are then keyed on the ids of its term dictionary instead of the terms.
+            The default is None and text is cleaned with clean_text.
+
         Returns
         -------
         None.
 
         '''
-        self._inv_index = {}
-        
+        self._inv_index = LayeredMap()
+        self._block_size = None
+        self._postings_frame = None
+        self._analyzer = analyzer
+
+    def copy(self):
+        '''
+        Returns a copy of the index that shares its terms and posting lists. The copy keeps its changes in a new layer
+        of terms, and takes its own copy of a posting list (sharing the ids it already holds) the first time it adds
+        to it, so the original index is never changed by the copy and copying does not depend on the size of the index.
+
+        Returns
+        -------
+        copied : InvertedIndex
+            The copy of the index.
+
+        '''
+        copied = InvertedIndex(self._analyzer)
+        copied._inv_index = self._inv_index.child()
+        copied._block_size = self._block_size
+        copied._postings_frame = self._postings_frame
+        return copied
+
+    def freeze(self):
+        '''
+        Compacts the layers of terms once the index is not going to change any more, see LayeredMap.compact
+        '''
+        self._inv_index.compact()
+
+    def compress(self, block_size = BLOCK_SIZE):
+        '''
+        Stores every posting list, and the ones added from now on, as a CompressedPostings
+
+        Parameters
+        ----------
+        block_size : int, optional
+            The number of ids in a compressed block. The default is BLOCK_SIZE.
+
+        Returns
+        -------
+        None.
+
+        '''
+        self._block_size = block_size
+        for term, postings in list(self._inv_index.items()):
+            self._inv_index[term] = self._new_postings(postings)
+
+    def _new_postings(self, identities):
+        '''
+        returns a posting list holding identities, compressed if compress has been called
+        '''
+        if self._block_size is None:
+            return PostingList(identities)
+        return CompressedPostings(identities, self._block_size)
+
+    def _add(self, term, identity):
+        '''
+        Adds a single posting to the index
+        '''
+        postings = self._inv_index.get(term)
+        if postings is None:
+            self._inv_index[term] = self._new_postings([identity])
+        else:
+            if not self._inv_index.in_top(term): # shared with the index this was copied from
+                postings = postings.copy()
+                self._inv_index[term] = postings
+            postings.append(identity)
+        self._postings_frame = None
+
     def add_numeric(self, value, identity):
         '''
         Add numeric values to the inverted index as strings
-        
+
         Parameters
         ----------
         value : int
@@ -34,12 +112,12 @@ class InvertedIndex:
         None.
 
         '''
-        
-        if str(value) in self._inv_index:
-            self._inv_index[str(value)].append(identity)
+
+        if self._analyzer is None:
+            self._add(str(value), identity)
         else:
-            self._inv_index[str(value)] = [identity]
-                
+            self._add(self._analyzer.get_dictionary().term_id(str(value)), identity)
+
     def add_text(self, text, identity):
         '''
         Add text to the inverted index
@@ -56,17 +134,136 @@ class InvertedIndex:
         None.
 
         '''
-        cleaned = clean_text(text)
+        if self._analyzer is None:
+            cleaned = clean_text(text)
+        else:
+            cleaned = self._analyzer.analyze(text)
         for word in cleaned:
-            if word in self._inv_index:
-                self._inv_index[word].append(identity)
-            else:
-                self._inv_index[word] = [identity]
+            self._add(word, identity)
+
+    def clean(self, text):
+        '''
+        returns the cleaned words of a search term, using the shared analyzer if there is one (list)
+        '''
+        if self._analyzer is None:
+            return clean_text(text)
+        return self._analyzer.clean(text)
+
+    def postings(self, term):
+        '''
+        Returns the posting list of a cleaned term
+
+        Parameters
+        ----------
+        term : str
+            The cleaned term.
+
+        Raises
+        ------
+        KeyError
+            if the term is not in the index
+
+        Returns
+        -------
+        postings : list or CompressedPostings
+            The index values of the shows the term was added for.
+
+        '''
+        key = term
+        if self._analyzer is not None:
+            key = self._analyzer.get_dictionary().lookup(term)
+        try:
+            return self._inv_index[key]
+        except KeyError:
+            raise KeyError(f"The term {term} is not in the index.")
+
+    def lookup(self, key):
+        '''
+        returns the posting list stored under key, a term id when the index has a shared analyzer, None if there is none
+        '''
+        return self._inv_index.get(key)
+
+    def document_frequency(self, term, identities = None):
+        '''
+        returns the number of shows the (cleaned) term is in, 0 if the term is not in the index.
+        If identities is given only the shows with those index values are counted, e.g. CatalogSnapshot.get_identities()
+        '''
+        try:
+            return len(set(_only(self.postings(term), identities)))
+        except KeyError:
+            return 0
+
+    def collection_frequency(self, term, identities = None):
+        '''
+        returns the number of times the (cleaned) term was added to the index, counting each field of a show.
+        If identities is given only the shows with those index values are counted
+        '''
+        try:
+            return sum(1 for _ in _only(self.postings(term), identities))
+        except KeyError:
+            return 0
+
+    def postings_frame(self):
+        '''
+        Returns every posting in the index as a DataFrame with a row per (term, identity) pair.
+        The frame is built once and reused until the index changes.
+
+        Returns
+        -------
+        frame : pandas DataFrame
+            The columns are term (categorical) and identity. A term added from several fields of a show appears once per field.
+
+        '''
+        if self._postings_frame is None:
+            terms = list(self._inv_index)
+            if self._analyzer is not None:
+                terms = [self._analyzer.get_dictionary().term(term_id) for term_id in terms]
+            lengths = np.fromiter((len(postings) for postings in self._inv_index.values()), dtype = np.int64, count = len(terms))
+            identities = np.fromiter(chain.from_iterable(self._inv_index.values()), dtype = np.int64, count = int(lengths.sum()))
+            codes = np.repeat(np.arange(len(terms)), lengths)
+            self._postings_frame = pd.DataFrame({'term': pd.Categorical.from_codes(codes, categories = terms),
+                                                 'identity': identities})
+        return self._postings_frame
+
+    def term_statistics(self, identities = None):
+        '''
+        Returns the document and collection frequency of every term in the index
+
+        Parameters
+        ----------
+        identities : iterable, optional
+            The index values of the shows to count, e.g. CatalogSnapshot.get_identities() to leave out removed shows.
+            The default is None and every posting is counted.
+
+        Returns
+        -------
+        statistics : pandas DataFrame
+            Indexed by term with the columns document_frequency and collection_frequency.
+
+        '''
+        frame = self.postings_frame()
+        if identities is not None:
+            frame = frame[frame['identity'].isin(np.fromiter(identities, dtype = np.int64))]
+        grouped = frame.groupby('term', observed = True)['identity']
+        return pd.DataFrame({'document_frequency': grouped.nunique(), 'collection_frequency': grouped.size()})
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_postings_frame'] = None # rebuilt from the postings when needed
+        return state
 
-            
     def return_index(self):
         '''
-        Returns the inverted indeex
+        Returns the inverted indeex, keyed on term ids when the index has a shared analyzer
         '''
-        
-        return self._inv_index
\ No newline at end of file
+
+        return self._inv_index
+
+
+def _only(postings, identities):
+    '''
+    returns the ids in postings that are in identities, or every id when identities is None
+    '''
+    if identities is None:
+        return postings
+    return (identity for identity in postings if identity in identities)
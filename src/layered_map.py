@@ -0,0 +1,129 @@
+class _Removed:
+    '''
+    Marks a key removed in a layer above the one holding it
+    '''
+    def __reduce__(self):
+        return '_REMOVED' # unpickles to the same object
+
+    def __repr__(self):
+        return '_REMOVED'
+
+_REMOVED = _Removed()
+
+
+class LayeredMap:
+    '''
+    A dict made of a stack of layers. Only the top layer is changed, the layers below it are shared with the maps it
+    was made from by child and are never changed again. Making the next generation of a map therefore costs about
+    the size of the change rather than the size of the map. compact merges the top layers whenever a layer is at least
+    half the size of the one below it, so there are only about log2(len) layers to look through.
+    '''
+
+    def __init__(self, items = None):
+        '''
+        Parameters
+        ----------
+        items : dict, optional
+            The contents to start with, the dict is used as the bottom layer without being copied.
+            The default is None and the map is empty.
+
+        Returns
+        -------
+        None.
+
+        '''
+        self._layers = [{} if items is None else items]
+        self._length = len(self._layers[0])
+
+    def child(self):
+        '''
+        Returns a map with the same contents whose changes go into a new top layer, leaving this map as it is
+        '''
+        child = LayeredMap()
+        child._layers = self._layers + [{}]
+        child._length = self._length
+        return child
+
+    def compact(self):
+        '''
+        Merges the top layers into new dicts while the top layer is at least half the size of the layer below it.
+        The merged layers are not changed, so maps sharing them are not affected.
+
+        Returns
+        -------
+        None.
+
+        '''
+        layers = self._layers
+        while len(layers) > 1 and len(layers[-1]) * 2 >= len(layers[-2]):
+            merged = dict(layers[-2])
+            merged.update(layers[-1])
+            if len(layers) == 2:  # nothing is below, removed keys can be dropped
+                merged = {key: value for key, value in merged.items() if value is not _REMOVED}
+            layers = layers[:-2] + [merged]
+        self._layers = layers
+
+    def in_top(self, key):
+        '''
+        returns whether the value of key is held by the top layer, the only one that can be changed (bool)
+        '''
+        top = self._layers[-1]
+        return key in top and top[key] is not _REMOVED
+
+    def get(self, key, default = None):
+        '''
+        returns the value of key, default if the key is not in the map
+        '''
+        for layer in reversed(self._layers):
+            if key in layer:
+                value = layer[key]
+                return default if value is _REMOVED else value
+        return default
+
+    def __getitem__(self, key):
+        value = self.get(key, _REMOVED)
+        if value is _REMOVED:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self.get(key, _REMOVED) is not _REMOVED
+
+    def __setitem__(self, key, value):
+        if key not in self:
+            self._length += 1
+        self._layers[-1][key] = value
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        if len(self._layers) == 1:
+            del self._layers[0][key]
+        else:
+            self._layers[-1][key] = _REMOVED
+        self._length -= 1
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        for key, _ in self.items():
+            yield key
+
+    def keys(self):
+        return iter(self)
+
+    def values(self):
+        for _, value in self.items():
+            yield value
+
+    def items(self):
+        for position, layer in enumerate(self._layers):
+            above = self._layers[position + 1:]
+            for key, value in layer.items():
+                if value is _REMOVED or any(key in higher for higher in above):
+                    continue # removed, or the value is in a higher layer
+                yield key, value
+
+    def __repr__(self):
+        return f"LayeredMap({dict(self.items())})"
@@ -0,0 +1,297 @@
+from bisect import bisect_left
+from itertools import islice
+
+BLOCK_SIZE = 128
+
+class PostingList:
+    '''
+    A posting list of ids held in a list that its copies share. The list is only appended to and every copy
+    remembers how many ids it holds, so a copy can add ids without the posting lists it was copied from seeing them
+    and without copying the ids it already has.
+    '''
+
+    def __init__(self, identities = ()):
+        '''
+        Parameters
+        ----------
+        identities : iterable, optional
+            The ids to start the posting list with. The default is an empty posting list.
+
+        Returns
+        -------
+        None.
+
+        '''
+        self._ids = list(identities)
+        self._length = len(self._ids)
+
+    def append(self, identity):
+        '''
+        Adds an id to the end of the posting list
+        '''
+        if len(self._ids) != self._length: # another copy has added to the shared list, take the part that is ours
+            self._ids = self._ids[:self._length]
+        self._ids.append(identity)
+        self._length += 1
+
+    def extend(self, identities):
+        '''
+        Adds every id in identities to the end of the posting list
+        '''
+        for identity in identities:
+            self.append(identity)
+
+    def copy(self):
+        '''
+        Returns a copy of the posting list that shares its ids
+        '''
+        copied = PostingList()
+        copied._ids = self._ids
+        copied._length = self._length
+        return copied
+
+    def __iter__(self):
+        return islice(self._ids, self._length)
+
+    def __len__(self):
+        return self._length
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __reduce__(self):
+        return (PostingList, (list(self),))
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+class CompressedPostings:
+    '''
+    A posting list stored as blocks of delta encoded varints. Each block keeps its first and last id as a skip pointer
+    so lookups only decode the blocks that can hold the ids asked for. Ids have to be added in increasing order, which
+    is the order the streaming service gives out identities. Like PostingList, copies share the blocks and each copy
+    remembers how many blocks it holds.
+    '''
+
+    def __init__(self, identities = (), block_size = BLOCK_SIZE):
+        '''
+        Parameters
+        ----------
+        identities : iterable, optional
+            Sorted ids to start the posting list with. The default is an empty posting list.
+        block_size : int, optional
+            The number of ids in a block. The default is BLOCK_SIZE.
+
+        Raises
+        ------
+        ValueError
+            when the block size is not positive
+
+        Returns
+        -------
+        None.
+
+        '''
+        if block_size <= 0:
+            raise ValueError(f"The block size is expected to be a positive integer, but {block_size} is given.")
+        self._block_size = block_size
+        self._blocks = []   # bytes of the gaps after the first id of the block
+        self._firsts = []   # first id of each block
+        self._lasts = []    # last id of each block, used to skip to the right block
+        self._tail = []     # ids that do not fill a block yet
+        self._nblocks = 0   # blocks of the shared lists that belong to this posting list
+        self._length = 0
+        for identity in identities:
+            self.append(identity)
+
+    def append(self, identity):
+        '''
+        Adds an id to the end of the posting list
+
+        Parameters
+        ----------
+        identity : int
+            The index value of the show, it cannot be smaller than the last id added.
+
+        Raises
+        ------
+        ValueError
+            when the id is smaller than the last id in the posting list
+
+        Returns
+        -------
+        None.
+
+        '''
+        if self._length > 0 and identity < self._last():
+            raise ValueError(f"Ids have to be added in increasing order, but {identity} was given after {self._last()}.")
+        self._tail.append(identity)
+        self._length += 1
+        if len(self._tail) == self._block_size:
+            self._pack()
+
+    def extend(self, identities):
+        '''
+        Adds every id in identities to the end of the posting list
+        '''
+        for identity in identities:
+            self.append(identity)
+
+    def copy(self):
+        '''
+        Returns a copy of the posting list that shares the encoded blocks, which are never changed once written
+        '''
+        copied = CompressedPostings(block_size = self._block_size)
+        copied._blocks = self._blocks
+        copied._firsts = self._firsts
+        copied._lasts = self._lasts
+        copied._nblocks = self._nblocks
+        copied._tail = list(self._tail)
+        copied._length = self._length
+        return copied
+
+    def _last(self):
+        '''
+        returns the last id in the posting list
+        '''
+        if len(self._tail) > 0:
+            return self._tail[-1]
+        return self._lasts[self._nblocks - 1]
+
+    def _pack(self):
+        '''
+        Encodes the tail into a new block
+        '''
+        if len(self._blocks) != self._nblocks: # another copy has added blocks to the shared lists
+            self._blocks = self._blocks[:self._nblocks]
+            self._firsts = self._firsts[:self._nblocks]
+            self._lasts = self._lasts[:self._nblocks]
+        self._firsts.append(self._tail[0])
+        self._lasts.append(self._tail[-1])
+        self._blocks.append(_encode_gaps(self._tail))
+        self._tail = []
+        self._nblocks += 1
+
+    def _decode(self, block):
+        '''
+        returns the ids stored in the block with the given position
+        '''
+        identities = [self._firsts[block]]
+        for gap in _decode_gaps(self._blocks[block]):
+            identities.append(identities[-1] + gap)
+        return identities
+
+    def intersection(self, candidates):
+        '''
+        Finds which of the candidates are in the posting list. Only the blocks that could hold a candidate are decoded.
+
+        Parameters
+        ----------
+        candidates : list
+            Sorted ids to look for.
+
+        Returns
+        -------
+        found : list
+            The candidates that are in the posting list, in the order they were given.
+
+        '''
+        found = []
+        block = 0
+        decoded = None
+        decoded_block = None
+        for identity in candidates:
+            block = bisect_left(self._lasts, identity, block, self._nblocks) # skip the blocks that end before the candidate
+            if block < self._nblocks:
+                if identity < self._firsts[block]:
+                    continue
+                if decoded_block != block:
+                    decoded = set(self._decode(block))
+                    decoded_block = block
+                if identity in decoded:
+                    found.append(identity)
+            elif identity in self._tail:
+                found.append(identity)
+        return found
+
+    def __contains__(self, identity):
+        return len(self.intersection([identity])) == 1
+
+    def __iter__(self):
+        for block in range(self._nblocks):
+            yield from self._decode(block)
+        yield from self._tail
+
+    def __len__(self):
+        return self._length
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for shared in ('_blocks', '_firsts', '_lasts'):
+            state[shared] = state[shared][:self._nblocks]
+        return state
+
+    def __repr__(self):
+        return f"CompressedPostings({list(self)})"
+
+
+def intersect(posting_lists):
+    '''
+    Finds the ids that are in every posting list, starting from the shortest list so compressed lists only decode
+    the blocks the remaining candidates fall in
+
+    Parameters
+    ----------
+    posting_lists : list
+        Lists of ids or CompressedPostings.
+
+    Returns
+    -------
+    common : list
+        The sorted ids that are in every posting list, without duplicates.
+
+    '''
+    posting_lists = sorted(posting_lists, key = len)
+    common = sorted(set(posting_lists[0]))
+    for postings in posting_lists[1:]:
+        if len(common) == 0:
+            break
+        if isinstance(postings, CompressedPostings):
+            common = postings.intersection(common)
+        else:
+            common = sorted(set(common).intersection(postings))
+    return common
+
+
+def _encode_gaps(identities):
+    '''
+    Encodes the gaps between consecutive ids as varints, 7 bits a byte with the high bit set while more bytes follow
+    '''
+    encoded = bytearray()
+    for previous, identity in zip(identities, identities[1:]):
+        gap = identity - previous
+        while gap >= 0x80:
+            encoded.append((gap & 0x7f) | 0x80)
+            gap >>= 7
+        encoded.append(gap)
+    return bytes(encoded)
+
+
+def _decode_gaps(encoded):
+    '''
+    Yields the gaps encoded by _encode_gaps
+    '''
+    gap = 0
+    shift = 0
+    for byte in encoded:
+        gap |= (byte & 0x7f) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            yield gap
+            gap = 0
+            shift = 0
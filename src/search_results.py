@@ -0,0 +1,211 @@
+import base64
+import json
+
+class SearchResults:
+    '''
+    SearchResults holds the ranked index values that match a search and only makes the Show objects of the page
+    asked for. The shows come from the generation of the catalog that was searched, so paging through the results
+    is not affected by updates made to the streaming service in the meantime.
+    '''
+
+    def __init__(self, snapshot, identities, term, unsure = False):
+        '''
+        Parameters
+        ----------
+        snapshot : CatalogSnapshot
+            The generation of the catalog that was searched.
+        identities : tuple
+            The index values of the matching shows, best match first.
+        term : str
+            The string that was searched for.
+        unsure : bool, optional
+            Whether the search was broadened to shows with any matching words. The default is False.
+
+        Returns
+        -------
+        None.
+
+        '''
+        self._snapshot = snapshot
+        self._identities = tuple(identities)
+        self._term = term
+        self._unsure = unsure
+
+    def get_generation(self):
+        '''
+        return the generation of the catalog that was searched (int)
+        '''
+        return self._snapshot.get_generation()
+
+    def get_identities(self):
+        '''
+        return the index values of the matching shows, best match first (tuple)
+        '''
+        return self._identities
+
+    def total(self):
+        '''
+        return the number of matching shows without making any Show (int)
+        '''
+        return len(self._identities)
+
+    def page(self, offset = 0, limit = 20):
+        '''
+        Returns a page of the matching shows
+
+        Parameters
+        ----------
+        offset : int, optional
+            The number of matching shows to skip. The default is 0.
+        limit : int, optional
+            The largest number of shows on the page. The default is 20.
+
+        Raises
+        ------
+        ValueError
+            when offset is negative or limit is not positive
+
+        Returns
+        -------
+        shows : list
+            The matching shows from position offset, best match first.
+
+        '''
+        if offset < 0:
+            raise ValueError(f"The offset cannot be negative, but {offset} is given.")
+        if limit <= 0:
+            raise ValueError(f"The limit is expected to be a positive integer, but {limit} is given.")
+        identities = self._snapshot.get_identities()
+        return [identities[identity] for identity in self._identities[offset:offset + limit]]
+
+    def cursor(self, offset):
+        '''
+        Returns an opaque string that StreamingService.search_page can carry on from, at position offset of these results
+        '''
+        return encode_cursor(self.get_generation(), self._term, self._unsure, offset)
+
+    def __len__(self):
+        return self.total()
+
+    def __iter__(self):
+        identities = self._snapshot.get_identities()
+        for identity in self._identities:
+            yield identities[identity]
+
+    def __getitem__(self, position):
+        identities = self._snapshot.get_identities()
+        if isinstance(position, slice):
+            return [identities[identity] for identity in self._identities[position]]
+        return identities[self._identities[position]]
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+class FederatedResults:
+    '''
+    FederatedResults holds the ranked matches of a search of several streaming services, see Catalog.federated_search.
+    The matches of the services are interleaved by rank, best first, and a show is only looked up when the page it is
+    on is asked for. Each service is read from the generation of its catalog that was searched.
+    '''
+
+    def __init__(self, names, snapshots, matches):
+        '''
+        Parameters
+        ----------
+        names : list
+            The names of the streaming services that were searched.
+        snapshots : list
+            The generation of the catalog of each service that was searched, in the same order as names.
+        matches : tuple
+            (position of the service in names, index value of the show) pairs, best match first.
+
+        Returns
+        -------
+        None.
+
+        '''
+        self._names = list(names)
+        self._snapshots = list(snapshots)
+        self._matches = tuple(matches)
+
+    def total(self):
+        '''
+        return the number of matches over every service without looking up any Show (int)
+        '''
+        return len(self._matches)
+
+    def page(self, offset = 0, limit = 20):
+        '''
+        Returns a page of the matches
+
+        Parameters
+        ----------
+        offset : int, optional
+            The number of matches to skip. The default is 0.
+        limit : int, optional
+            The largest number of matches on the page. The default is 20.
+
+        Raises
+        ------
+        ValueError
+            when offset is negative or limit is not positive
+
+        Returns
+        -------
+        matches : list
+            (service name, show) pairs from position offset, best match first.
+
+        '''
+        if offset < 0:
+            raise ValueError(f"The offset cannot be negative, but {offset} is given.")
+        if limit <= 0:
+            raise ValueError(f"The limit is expected to be a positive integer, but {limit} is given.")
+        return [self._match(match) for match in self._matches[offset:offset + limit]]
+
+    def _match(self, match):
+        '''
+        returns the (service name, show) pair of a (position of the service, index value) pair
+        '''
+        service, identity = match
+        return self._names[service], self._snapshots[service].get_identities()[identity]
+
+    def __len__(self):
+        return self.total()
+
+    def __iter__(self):
+        for match in self._matches:
+            yield self._match(match)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self._match(match) for match in self._matches[position]]
+        return self._match(self._matches[position])
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+def encode_cursor(generation, term, unsure, offset):
+    '''
+    Encodes the position in the results of a search as an opaque string
+    '''
+    position = json.dumps({'generation': generation, 'term': term, 'unsure': unsure, 'offset': offset})
+    return base64.urlsafe_b64encode(position.encode()).decode()
+
+
+def decode_cursor(cursor):
+    '''
+    Decodes a cursor made by encode_cursor into a dict with the keys generation, term, unsure and offset
+
+    Raises
+    ------
+    ValueError
+        when the cursor was not made by encode_cursor
+
+    '''
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return {key: position[key] for key in ('generation', 'term', 'unsure', 'offset')}
+    except (ValueError, TypeError, KeyError, AttributeError):
+        raise ValueError(f"{cursor} is not a search cursor.")
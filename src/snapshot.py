@@ -0,0 +1,127 @@
+from inv_index import InvertedIndex
+from layered_map import LayeredMap
+
+class CatalogSnapshot:
+    '''
+    CatalogSnapshot is one generation of the catalog of a streaming service: the shows, their index values and the
+    inverted index. A published snapshot is never changed, updates are made to a copy which is then published in its
+    place, so a search can keep using the snapshot it started with without taking a lock.
+    '''
+
+    def __init__(self, generation = 0, shows = None, identities = None, inv_index = None, positions = None, next_identity = 0):
+        '''
+        Parameters
+        ----------
+        generation : int, optional
+            The number of updates published before this snapshot. The default is 0.
+        shows : LayeredMap, optional
+            The shows keyed by title. The default is None and the snapshot is empty.
+        identities : LayeredMap, optional
+            The shows keyed by their index value. The default is None and the snapshot is empty.
+        inv_index : InvertedIndex, optional
+            The inverted index of the shows. The default is None and a new empty index is made.
+        positions : LayeredMap, optional
+            The index values keyed by title. The default is None and the snapshot is empty.
+        next_identity : int, optional
+            The index value the next show added is given. The default is 0.
+
+        Returns
+        -------
+        None.
+
+        '''
+        self._generation = generation
+        self._shows = LayeredMap() if shows is None else shows
+        self._identities = LayeredMap() if identities is None else identities
+        self._inv_index = InvertedIndex() if inv_index is None else inv_index
+        self._positions = LayeredMap() if positions is None else positions
+        self._next_identity = next_identity
+        self._term_counts = {}
+
+    def copy(self):
+        '''
+        Returns the next generation of the catalog to make updates to. Its changes go into new layers of the maps of
+        shows and terms, everything else (including the ids already in the posting lists) is shared with this snapshot.
+        '''
+        return CatalogSnapshot(self._generation + 1, self._shows.child(), self._identities.child(), self._inv_index.copy(),
+                               self._positions.child(), self._next_identity)
+
+    def freeze(self):
+        '''
+        Compacts the layers of the snapshot before it is published, after which it is not changed any more
+        '''
+        self._shows.compact()
+        self._identities.compact()
+        self._positions.compact()
+        self._inv_index.freeze()
+
+    def get_generation(self):
+        '''
+        return the generation of the snapshot (int)
+        '''
+        return self._generation
+
+    def get_shows(self):
+        '''
+        return the shows keyed by title (LayeredMap)
+        '''
+        return self._shows
+
+    def get_identities(self):
+        '''
+        return the shows keyed by their index value (LayeredMap)
+        '''
+        return self._identities
+
+    def get_inv_index(self):
+        '''
+        return the inverted index (InvertedIndex)
+        '''
+        return self._inv_index
+
+    def get_term_counts(self):
+        '''
+        return the cache of StreamingService.term_counts for this generation (dict)
+        '''
+        return self._term_counts
+
+    def add_show(self, show):
+        '''
+        Adds a show to the snapshot, in place of a show with the same title, and returns the index value it is given (int)
+        '''
+        title = show.get_title()
+        if title in self._positions:
+            del self._identities[self._positions[title]]
+        identity = self._next_identity
+        self._next_identity += 1
+        self._shows[title] = show
+        self._identities[identity] = show
+        self._positions[title] = identity
+        return identity
+
+    def remove_show(self, title):
+        '''
+        Removes the show with the given title. Its index value stays in the posting lists but is no longer available,
+        and the snapshot no longer holds the show.
+
+        Raises
+        ------
+        KeyError
+            if the snapshot has no show with the title
+
+        '''
+        identity = self._positions[title]
+        del self._shows[title]
+        del self._identities[identity]
+        del self._positions[title]
+
+    def is_available(self, identity):
+        '''
+        return whether the show with the given index value has not been removed (bool)
+        '''
+        return identity in self._identities
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_term_counts'] = {}
+        return state
@@ -1,36 +1,170 @@
 from show import Show
 from inv_index import InvertedIndex
-from cleaner import clean_text
+from postings import intersect
+from snapshot import CatalogSnapshot
+from search_results import SearchResults, decode_cursor
 from collections import Counter
-from itertools import repeat, chain
+from itertools import chain
 from collections import OrderedDict
+from contextlib import contextmanager
+import threading
+import time
+import weakref
+import pandas as pd
+
+SHOW_FIELDS = ('title', 'director', 'cast', 'country', 'show_type', 'year_added', 'rating', 'duration', 'genre', 'description')
+COLUMN_ALIASES = {'type': 'show_type', 'date_added': 'year_added', 'listed_in': 'genre'} # netflix_titles.csv column names
+CURSOR_LIFETIME = 600 # seconds a replaced generation is kept so search cursors can carry on after an update
+REPLACED_GENERATIONS = 16 # the most replaced generations kept for cursors, older ones are kept only while something holds them
+RANKING_CACHE_SIZE = 128 # searches whose ranked index values are kept for search_page
 
 class StreamingService:
     '''
     StreamingService represents streaming service that stores and provides different TV and movie shows
     '''
     
-    def __init__(self, name, show_data):
+    def __init__(self, name, show_data = None, block_size = None, analyzer = None, show_factory = Show):
         '''
         Parameters
         ----------
         name : str
             name of the streaming service
-        show_data : pandas DataFrame
+        show_data : pandas DataFrame or iterable, optional
             each row contains the information about title, type, year added, rating, duration, description
-            assume show title is unique
+            assume show title is unique. Anything accepted by ingest can be given.
+            The default is None and the streaming service starts empty.
+        block_size : int, optional
+            Stores the posting lists as delta encoded blocks of block_size ids (see postings.CompressedPostings).
+            The default is None and the posting lists are not compressed.
+        analyzer : Analyzer, optional
+            An analyzer shared with other streaming services, see catalog.Catalog. The default is None.
+        show_factory : callable, optional
+            Makes the Show objects from the arguments of add_show. The default is Show.
 
         Returns
         -------
         None.
         '''
         self._name = name
-        self._shows = {}
-        self._identities = {}
-        self._inv_index = InvertedIndex()
-        for _, row in show_data.iterrows():
-            self.add_show(*row)
+        self._snapshot = CatalogSnapshot(inv_index = InvertedIndex(analyzer = analyzer))
+        self._show_factory = show_factory
+        self._replaced = OrderedDict() # generation -> (time it was replaced, snapshot)
+        self._live = weakref.WeakValueDictionary() # every generation something (e.g. SearchResults) still holds
+        self._live[0] = self._snapshot
+        self._pending = None
+        self._write_lock = threading.RLock()
+        self._rankings = OrderedDict() # (generation, term, unsure) -> ranked index values
+        self._rankings_lock = threading.Lock()
+        if block_size is not None:
+            self._snapshot.get_inv_index().compress(block_size)
+        if show_data is not None:
+            self.ingest(show_data)
+
+    def ingest(self, rows):
+        '''
+        Adds shows to the streaming service from a DataFrame, the chunks of pd.read_csv(..., chunksize = n) or any iterator of rows.
+        Only one chunk is held at a time, so building the catalog takes about the memory of a chunk on top of the
+        shows and the inverted index.
+
+        Parameters
+        ----------
+        rows : pandas DataFrame or iterable
+            A DataFrame, an iterable of DataFrames, or an iterable of rows. A row is either a tuple in the order of the
+            arguments of add_show or a dict keyed by those names. DataFrame columns are matched by the same names and
+            the other columns are ignored (the netflix_titles.csv column names are also accepted). A DataFrame with
+            exactly ten columns that do not all match is read in column order.
+
+        Raises
+        ------
+        ValueError
+            if a DataFrame without exactly ten columns is missing one of the columns
+
+        Returns
+        -------
+        None.
+        '''
+        with self.batch():
+            for row in _iter_rows(rows):
+                self.add_show(*row)
+
+    def snapshot(self):
+        '''
+        Returns the latest published generation of the catalog. Nothing in it changes, so it can be searched
+        from any thread without a lock while the streaming service is being updated.
+
+        Returns
+        -------
+        snapshot : CatalogSnapshot
+            The current generation of the catalog.
+
+        '''
+        return self._snapshot
+
+    @contextmanager
+    def batch(self):
+        '''
+        Groups updates into a single new generation of the catalog. Inside the with block add_show and remove_show
+        change the next generation of the catalog, which shares everything that is not changed with the current one
+        and is published in one assignment when the block ends. Searches keep seeing the previous generation until then and if an error
+        is raised nothing is published. Writers wait for each other, readers never wait.
+
+        Yields
+        ------
+        self : StreamingService
+            The streaming service being updated.
+
+        '''
+        with self._write_lock:
+            if self._pending is not None: # already in a batch, the outer batch publishes
+                yield self
+                return
+            self._pending = self._snapshot.copy()
+            try:
+                yield self
+                self._pending.freeze()
+                self._publish(self._pending)
+            finally:
+                self._pending = None
 
+    def _publish(self, snapshot):
+        '''
+        Makes snapshot the generation searches read. The last REPLACED_GENERATIONS generations it replaces are kept for
+        CURSOR_LIFETIME seconds, and every generation is kept for as long as something else (e.g. SearchResults) holds it,
+        so search_page can carry on from its cursors without every update of a busy service being held in memory.
+        '''
+        now = time.monotonic()
+        self._replaced[self._snapshot.get_generation()] = (now, self._snapshot)
+        while len(self._replaced) > REPLACED_GENERATIONS or (len(self._replaced) > 0 and now - next(iter(self._replaced.values()))[0] > CURSOR_LIFETIME):
+            self._replaced.popitem(last = False)
+        self._live[snapshot.get_generation()] = snapshot
+        self._snapshot = snapshot
+
+    def _find_generation(self, generation):
+        '''
+        returns the snapshot of a generation that is still kept, None if it is not
+        '''
+        if generation == self._snapshot.get_generation():
+            return self._snapshot
+        replaced = self._replaced.get(generation) # a single lookup, a writer may be dropping old generations
+        if replaced is not None:
+            return replaced[1]
+        return self._live.get(generation)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for unpicklable in ('_write_lock', '_replaced', '_live', '_rankings', '_rankings_lock'): # the locks, kept generations and cached rankings are made again
+            del state[unpicklable]
+        state['_pending'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._write_lock = threading.RLock()
+        self._replaced = OrderedDict()
+        self._live = weakref.WeakValueDictionary()
+        self._live[self._snapshot.get_generation()] = self._snapshot
+        self._rankings = OrderedDict()
+        self._rankings_lock = threading.Lock()
 
     def get_name(self):
         '''
@@ -49,13 +183,14 @@ class StreamingService:
             
         '''
         shows = []
-        for show in self._shows.values():
+        for show in self._snapshot.get_shows().values():
             shows.append(show)
         return shows
 
     def add_show(self, title, director, cast, country, show_type, year_added, rating, duration, genre, description):
         '''
         add a show to the streaming service. Assume show title is unique
+        Outside of a batch every call publishes a new generation of the catalog, which costs about the size of the change.
 
         Parameters
         ----------
@@ -77,19 +212,19 @@ class StreamingService:
         None.
 
         '''
-        self._shows[title] = Show(title, director, cast, country, show_type, year_added, rating, duration, genre, description)
-        self._inv_index.add_text(title, len(self._identities))
-        self._inv_index.add_text(str(director), len(self._identities)) 
-        self._inv_index.add_text(str(cast), len(self._identities))
-        self._inv_index.add_text(str(country), len(self._identities))
-        self._inv_index.add_text(show_type, len(self._identities))
-        self._inv_index.add_numeric(year_added, len(self._identities))
-        self._inv_index.add_text(str(rating), len(self._identities))
-        self._inv_index.add_text(duration, len(self._identities))
-        self._inv_index.add_text(str(genre), len(self._identities))
-        self._inv_index.add_text(description, len(self._identities))
-        self._identities[len(self._identities)] = self._shows[title]
-        
+        with self.batch():
+            inv_index = self._pending.get_inv_index()
+            identity = self._pending.add_show(self._show_factory(title, director, cast, country, show_type, year_added, rating, duration, genre, description))
+            inv_index.add_text(title, identity)
+            inv_index.add_text(str(director), identity)
+            inv_index.add_text(str(cast), identity)
+            inv_index.add_text(str(country), identity)
+            inv_index.add_text(show_type, identity)
+            inv_index.add_numeric(year_added, identity)
+            inv_index.add_text(str(rating), identity)
+            inv_index.add_text(duration, identity)
+            inv_index.add_text(str(genre), identity)
+            inv_index.add_text(description, identity)
 
     def get_show(self, show_title):
         '''
@@ -112,7 +247,7 @@ class StreamingService:
 
         '''
         try:
-            return self._shows[show_title]
+            return self._snapshot.get_shows()[show_title]
         except KeyError:
             raise KeyError(f"The show {show_title} is not available from {self.get_name()}.")
 
@@ -134,18 +269,19 @@ class StreamingService:
         -------
         None.
         '''
-        try:
-            del self._shows[show_title]
-        except KeyError:
-            raise KeyError(f"The show {show_title} is not available from {self.get_name()}.")
+        with self.batch():
+            try:
+                self._pending.remove_show(show_title)
+            except KeyError:
+                raise KeyError(f"The show {show_title} is not available from {self.get_name()}.")
             
     def find_show(self, id_given):
         ''' 
         Given an id index, it returns the corresponding show
         '''
-        return self._identities[id_given]
+        return self._snapshot.get_identities()[id_given]
             
-    def search(self, term, unsure = False):
+    def search(self, term, unsure = False, snapshot = None):
         '''
         searches for shows with matching key words
         
@@ -155,18 +291,35 @@ class StreamingService:
             The string to search for.
         unsure : bool, optional
             Broadens the search range to shows with any matching words, ordering the shows by word matches. The default is False.
+        snapshot : CatalogSnapshot, optional
+            The generation of the catalog to search. The default is None and the latest published generation is searched.
 
         Returns
         -------
-        matching_shows: list
-            The shows that match the search term
+        matching_shows: SearchResults
+            The shows that match the search term. Only the index values are kept, the shows are looked up a page at a time.
+        '''
+        if snapshot is None:
+            snapshot = self._snapshot # read once, later updates publish a new snapshot instead of changing this one
+        return SearchResults(snapshot, self._ranked(snapshot, term, unsure), term, unsure)
+
+    def _ranked(self, snapshot, term, unsure):
+        '''
+        Returns the index values of the available shows matching term in snapshot, best first. The rankings of the
+        last RANKING_CACHE_SIZE searches are kept, so the pages of a search do not rank the shows again.
         '''
-        matching_shows = []
+        key = (snapshot.get_generation(), term, unsure)
+        with self._rankings_lock:
+            ranked = self._rankings.get(key)
+            if ranked is not None:
+                self._rankings.move_to_end(key)
+                return ranked
+        inv_index = snapshot.get_inv_index()
         words_and_results = []
-        terms = clean_text(term)
+        terms = inv_index.clean(term)
         for word in terms:
             try:
-                show_id = self._inv_index.return_index()[word]
+                show_id = inv_index.postings(word)
                 words_and_results.append(show_id)
             except:
                 print(f"Excluding '{word}' from the search as no matches were found")
@@ -174,27 +327,205 @@ class StreamingService:
             
         if len(words_and_results) == 0:
             raise ValueError("None of the search phrase matches a show")
-            
-        if unsure == True:
-            for word in words_and_results:
-                for idenitiy in word:
-                    matching_shows.append(self._identities[idenitiy])
-            matching_shows = list(chain.from_iterable(repeat(i, c) for i,c in Counter(matching_shows).most_common())) # orders them by number of occurences
-            matching_shows = OrderedDict.fromkeys(matching_shows)
-            matching_shows = list(matching_shows)
-      
-        if unsure == False:
-            common_values = set(words_and_results[0]).intersection(*words_and_results) # Finds the common value in the lists of lists (words that match all the input) without letting duplicates in twice (which occurs if a common word is in two places likee description and title. 
-            for value in common_values:
-                matching_shows.append(self._identities[value])
-                
-        return matching_shows      
+
+        ranked = rank_postings(snapshot, words_and_results, unsure)
+        with self._rankings_lock:
+            self._rankings[key] = ranked
+            if len(self._rankings) > RANKING_CACHE_SIZE:
+                self._rankings.popitem(last = False)
+        return ranked
+
+    def search_page(self, cursor, limit = 20):
+        '''
+        Carries on a search from a cursor given by SearchResults.cursor, against the generation of the catalog the
+        cursor was made from
+
+        Parameters
+        ----------
+        cursor : str
+            The cursor to carry on from.
+        limit : int, optional
+            The largest number of shows on the page. The default is 20.
+
+        Raises
+        ------
+        ValueError
+            if the cursor is not valid, or its generation was replaced more than CURSOR_LIFETIME seconds or
+            REPLACED_GENERATIONS updates ago and nothing holds it any more
+
+        Returns
+        -------
+        shows : list
+            The page of matching shows.
+        next_cursor : str
+            The cursor of the next page, None if this is the last page.
+
+        '''
+        position = decode_cursor(cursor)
+        snapshot = self._find_generation(position['generation'])
+        if snapshot is None:
+            raise ValueError(f"The cursor is for generation {position['generation']} of {self.get_name()} which is no longer kept, search again.")
+        results = self.search(position['term'], position['unsure'], snapshot) # the ranking is cached, only the page is looked up
+        offset = position['offset']
+        shows = results.page(offset, limit)
+        next_cursor = None
+        if offset + limit < results.total():
+            next_cursor = results.cursor(offset + limit)
+        return shows, next_cursor
             
     def get_inv_index(self):
         ''' 
         returns the inverted index
         '''
-        return self._inv_index.dic()
-            
-    
-        
+        return self._snapshot.get_inv_index().return_index()
+
+    def term_statistics(self):
+        '''
+        Returns the document frequency (number of shows) and collection frequency (number of postings over every field)
+        of each term in the inverted index, counting only the shows still available, see InvertedIndex.term_statistics
+        '''
+        snapshot = self._snapshot
+        return snapshot.get_inv_index().term_statistics(snapshot.get_identities())
+
+    def document_frequency(self, term):
+        '''
+        returns the number of available shows the (cleaned) term is in, see InvertedIndex.document_frequency (int)
+        '''
+        snapshot = self._snapshot
+        return snapshot.get_inv_index().document_frequency(term, snapshot.get_identities())
+
+    def collection_frequency(self, term):
+        '''
+        returns the number of times the (cleaned) term is in a field of an available show, see InvertedIndex.collection_frequency (int)
+        '''
+        snapshot = self._snapshot
+        return snapshot.get_inv_index().collection_frequency(term, snapshot.get_identities())
+
+    def term_counts(self, by = 'year'):
+        '''
+        Counts how many shows in each bucket contain each term, using the postings already in the inverted index
+        instead of cleaning the text again. The counts for 'year' and 'type' are kept for each generation of the catalog.
+
+        Parameters
+        ----------
+        by : str, dict or pandas Series, optional
+            'year' buckets the shows by the year they were added, 'type' by the show type. A dict or Series
+            maps the index value of a show (its position in the data it was read from) to a bucket, for example
+            pd.cut(data['release_year'], [0, 1980, 2000, 2010, 2030]).reset_index(drop = True).
+            The default is 'year'.
+
+        Raises
+        ------
+        ValueError
+            when by is a string other than 'year' or 'type'
+
+        Returns
+        -------
+        counts : pandas Series
+            The number of shows indexed by (bucket, term).
+
+        '''
+        snapshot = self._snapshot
+        cache = snapshot.get_term_counts()
+        cacheable = isinstance(by, str)
+        if cacheable and by in cache:
+            return cache[by]
+        buckets = _buckets(snapshot, by)
+        postings = snapshot.get_inv_index().postings_frame().drop_duplicates() # a term can be added from several fields of the same show
+        joined = postings.merge(buckets.rename('bucket'), left_on = 'identity', right_index = True)
+        counts = joined.groupby(['bucket', 'term'], observed = True).size()
+        if cacheable:
+            cache[by] = counts
+        return counts
+
+    def top_terms(self, bucket, k = 10, by = 'year'):
+        '''
+        Returns the k terms found in the most shows of a bucket
+
+        Parameters
+        ----------
+        bucket : object
+            The bucket to look at, e.g. 2019 when by is 'year' or 'Movie' when by is 'type'.
+        k : int, optional
+            The number of terms to return. The default is 10.
+        by : str, dict or pandas Series, optional
+            How the shows are bucketed, see term_counts. The default is 'year'.
+
+        Raises
+        ------
+        KeyError
+            if no show is in the bucket
+
+        Returns
+        -------
+        top : list
+            (term, number of shows) tuples, most common first.
+
+        '''
+        counts = self.term_counts(by)
+        try:
+            in_bucket = counts.xs(bucket, level = 'bucket')
+        except KeyError:
+            raise KeyError(f"No show in {self.get_name()} is in the bucket {bucket}.")
+        return list(in_bucket.nlargest(k).items())
+
+
+def _iter_rows(rows):
+    '''
+    Yields the rows of a DataFrame, of each DataFrame in an iterable, or of an iterable of tuples / dicts as tuples
+    in the order of the arguments of StreamingService.add_show
+    '''
+    if hasattr(rows, 'itertuples'):
+        rows = [rows]
+    for row in rows:
+        if hasattr(row, 'itertuples'):
+            yield from _frame_fields(row).itertuples(index = False, name = None)
+        elif isinstance(row, dict):
+            fields = {COLUMN_ALIASES.get(key, key): value for key, value in row.items()}
+            yield tuple(fields.get(field) for field in SHOW_FIELDS)
+        else:
+            yield tuple(row)
+
+
+def _frame_fields(frame):
+    '''
+    returns the columns of a DataFrame that hold the arguments of StreamingService.add_show, in that order.
+    Columns are matched by name (netflix_titles.csv names included) and the other columns are dropped. A frame with
+    exactly one column per argument whose names do not match is taken in the order of its columns, as before.
+    '''
+    frame = frame.rename(columns = COLUMN_ALIASES)
+    missing = [field for field in SHOW_FIELDS if field not in frame.columns]
+    if len(missing) == 0:
+        return frame[list(SHOW_FIELDS)]
+    if len(frame.columns) == len(SHOW_FIELDS):
+        return frame
+    raise ValueError(f"The show data is missing the columns {missing}.")
+
+
+def _buckets(snapshot, by):
+    '''
+    returns a Series mapping the index value of each show still available in the snapshot to its bucket
+    '''
+    identities = snapshot.get_identities()
+    available = [identity for identity in identities if snapshot.is_available(identity)]
+    if isinstance(by, str): # checked first, comparing a Series with a string compares every value
+        if by == 'year':
+            added = pd.Series([identities[identity].get_year_added() for identity in available], index = available)
+            return pd.to_numeric(added.astype(str).str.extract(r'(\d{4})\s*$')[0], errors = 'coerce').dropna().astype(int) # date_added is like 'September 25, 2021'
+        if by == 'type':
+            return pd.Series([identities[identity].get_show_type() for identity in available], index = available)
+        raise ValueError(f"Shows can be bucketed by 'year' or 'type', but {by} is given.")
+    by = pd.Series(by)
+    return by[by.index.isin(available)]
+
+
+def rank_postings(snapshot, words_and_results, unsure = False):
+    '''
+    Ranks the index values in the posting lists of the words of a search, leaving out shows removed from snapshot.
+    Used by StreamingService.search and Catalog.federated_search (tuple)
+    '''
+    if unsure == True:
+        matching_ids = [identity for identity, _ in Counter(chain.from_iterable(words_and_results)).most_common()] # orders them by number of occurences
+    else:
+        matching_ids = intersect(words_and_results) # Finds the common value in the lists of lists (words that match all the input) without letting duplicates in twice (which occurs if a common word is in two places likee description and title. 
+    return tuple(identity for identity in matching_ids if snapshot.is_available(identity))
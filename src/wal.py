@@ -0,0 +1,136 @@
+import os
+import pickle
+import struct
+import zlib
+
+HEADER = struct.Struct('>II') # length and crc32 of the record that follows
+
+class WriteAheadLog:
+    '''
+    An append-only log of records. Every record is written with its length and checksum so a record that was only
+    partly written before a crash is found and cut off when the log is opened again.
+    '''
+
+    def __init__(self, path, sync_every = 32):
+        '''
+        Opens the log at path, making it if it does not exist, and cuts off a partly written last record.
+
+        Parameters
+        ----------
+        path : str
+            The file of the log.
+        sync_every : int, optional
+            The number of records to write before they are forced to disk with fsync. Records are always handed to the
+            operating system straight away, so only a power cut can lose the last (up to sync_every - 1) records.
+            The default is 32.
+
+        Raises
+        ------
+        ValueError
+            when sync_every is not positive
+
+        Returns
+        -------
+        None.
+
+        '''
+        if sync_every <= 0:
+            raise ValueError(f"sync_every is expected to be a positive integer, but {sync_every} is given.")
+        self._path = path
+        self._sync_every = sync_every
+        self._unsynced = 0
+        self._records = list(self._read())
+        self._file = open(path, 'ab', buffering = 0) # unbuffered, so a failed write can be cut off without a buffer writing it again
+        self._end = self._file.seek(0, os.SEEK_END) # where the last complete record ends
+        self._failed = False
+
+    def _read(self):
+        '''
+        Yields the records in the log, truncating the file after the last complete record
+        '''
+        if not os.path.exists(self._path):
+            return
+        with open(self._path, 'r+b') as log:
+            end = 0
+            while True:
+                header = log.read(HEADER.size)
+                if len(header) < HEADER.size:
+                    break
+                length, checksum = HEADER.unpack(header)
+                payload = log.read(length)
+                if len(payload) < length or zlib.crc32(payload) != checksum:
+                    break
+                end = log.tell()
+                yield pickle.loads(payload)
+            log.truncate(end)
+
+    def records(self):
+        '''
+        returns the records that were in the log when it was opened, oldest first (list)
+        '''
+        return self._records
+
+    def append(self, record):
+        '''
+        Adds a record to the end of the log. If writing the record fails the part that was written is cut off again,
+        so the records added after it are not hidden behind a broken record when the log is read.
+
+        Parameters
+        ----------
+        record : object
+            Any picklable object.
+
+        Raises
+        ------
+        OSError
+            if the record could not be written, or an earlier failed record could not be cut off and the log
+            does not take any more records
+
+        Returns
+        -------
+        None.
+
+        '''
+        if self._failed:
+            raise OSError(f"A failed write to {self._path} could not be undone, no more records can be added to the log.")
+        payload = pickle.dumps(record, pickle.HIGHEST_PROTOCOL)
+        data = HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+        try:
+            written = 0
+            while written < len(data):
+                written += self._file.write(data[written:])
+        except BaseException:
+            try:
+                self._file.truncate(self._end)
+            except OSError:
+                self._failed = True
+            raise
+        self._end += len(data)
+        self._unsynced += 1
+        if self._unsynced >= self._sync_every:
+            self.sync()
+
+    def sync(self):
+        '''
+        Forces every record written so far to disk
+        '''
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+
+    def reset(self):
+        '''
+        Removes every record from the log, used once the records are in a checkpoint
+        '''
+        self._file.truncate(0)
+        self.sync()
+        self._end = 0
+        self._failed = False
+        self._records = []
+
+    def close(self):
+        '''
+        Forces the records to disk and closes the log
+        '''
+        self.sync()
+        self._file.close()
@@ -0,0 +1,44 @@
+import os
+import re
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, 'src')) # the modules in src are imported by name
+
+import analyzer
+import cleaner
+import inv_index
+
+SHOW = ('Chess Master', 'Ann Lee', 'Bob Cy', 'United Kingdom', 'Movie', 'September 25, 2019', 'PG', '90 min', 'Drama', 'A chess drama')
+
+SHOWS = [SHOW,
+         ('Time Travel Dad', 'Dan Roe', 'Eve Fox', 'United States', 'TV Show', 'May 1, 2020', 'TV-14', '2 Seasons', 'Comedy', 'A dad travels in time'),
+         ('Drama Queen', 'Fay Gold', 'Gus Hill', 'United States', 'Movie', 'June 3, 2020', 'R', '100 min', 'Drama', 'The queen of drama and chess'),
+         ('Space Chess', 'Hal Ivy', 'Ian Jay', 'France', 'Movie', 'July 9, 2021', 'PG', '80 min', 'Sci-Fi', 'Chess in space with time loops')]
+
+STOPWORDS = {'a', 'an', 'and', 'in', 'of', 'the', 'with'}
+
+NLTK_DATA = cleaner.clean_text('chess') is not None # the stopwords and punkt data are downloaded separately from nltk
+
+
+def _clean_text(uncleaned):
+    '''
+    Stands in for cleaner.clean_text when the nltk data is not installed: lower case words without stop words or
+    single characters, each once. The words the tests search for are their own stems.
+    '''
+    if not isinstance(uncleaned, str):
+        print(f"A string was axcpected but a {type(uncleaned)} was given")
+        return None
+    words = [word for word in re.findall(r'[a-z0-9]+', uncleaned.lower()) if len(word) > 1 and word not in STOPWORDS]
+    return list(dict.fromkeys(words))
+
+
+@pytest.fixture(autouse = True)
+def clean_text(monkeypatch):
+    '''
+    Makes the tests that clean text run without the nltk data
+    '''
+    if not NLTK_DATA:
+        monkeypatch.setattr(inv_index, 'clean_text', _clean_text)
+        monkeypatch.setattr(analyzer, 'clean_text', _clean_text)
@@ -0,0 +1,107 @@
+import pickle
+
+import gc
+
+import pandas as pd
+import pytest
+
+import streaming_service
+from catalog import Catalog
+from conftest import SHOW, SHOWS
+
+
+@pytest.fixture
+def catalog():
+    catalog = Catalog()
+    catalog.add_service('Netflix', SHOWS)
+    catalog.add_service('Hulu', SHOWS[1:] + [('Only Here', *SHOW[1:])])
+    return catalog
+
+
+def test_services_share_shows_and_strings(catalog):
+    netflix = catalog.get_service('Netflix')
+    hulu = catalog.get_service('Hulu')
+    assert netflix.get_show('Space Chess') is hulu.get_show('Space Chess')
+    assert netflix.get_show('Chess Master').get_description() is hulu.get_show('Only Here').get_description()
+    assert netflix.snapshot().get_inv_index().postings('chess') is not hulu.snapshot().get_inv_index().postings('chess')
+
+
+def test_add_service_rejects_duplicate_names(catalog):
+    with pytest.raises(ValueError):
+        catalog.add_service('Hulu')
+    with pytest.raises(KeyError):
+        catalog.get_service('Disney')
+    assert catalog.get_services() == ['Netflix', 'Hulu']
+
+
+def test_unused_shows_and_strings_are_freed(catalog, monkeypatch):
+    monkeypatch.setattr(streaming_service, 'CURSOR_LIFETIME', -1) # do not keep replaced generations
+    analyzer = catalog.get_analyzer()
+    catalog.get_service('Netflix').remove_show('Chess Master')
+    catalog.get_service('Netflix').add_show('Filler', *SHOW[1:])
+    gc.collect()
+    assert ('Chess Master',) + SHOW[1:] not in catalog._shows
+    analyzer.share('flush the released strings')
+    assert 'Chess Master' not in analyzer._strings
+    assert 'A chess drama' in analyzer._strings # still used by Only Here and Filler
+
+
+def test_federated_search(catalog):
+    results = catalog.federated_search('chess')
+    matches = [(name, show.get_title()) for name, show in results]
+    assert matches == [('Netflix', 'Chess Master'), ('Hulu', 'Drama Queen'), ('Netflix', 'Drama Queen'),
+                       ('Hulu', 'Space Chess'), ('Netflix', 'Space Chess'), ('Hulu', 'Only Here')]
+    assert results.total() == len(results) == 6
+    assert results.page(4, 5) == results[4:]
+    with pytest.raises(ValueError):
+        results.page(0, 0)
+
+
+def test_federated_search_of_some_services(catalog):
+    results = catalog.federated_search('chess space', services = ['Hulu'], unsure = True)
+    assert [(name, show.get_title()) for name, show in results][:1] == [('Hulu', 'Space Chess')]
+    assert {name for name, _ in results} == {'Hulu'}
+    with pytest.raises(KeyError):
+        catalog.federated_search('chess', services = ['Disney'])
+
+
+def test_federated_search_leaves_out_removed_shows(catalog):
+    catalog.get_service('Hulu').remove_show('Only Here')
+    assert ('Hulu', 'Only Here') not in [(name, show.get_title()) for name, show in catalog.federated_search('chess')]
+
+
+def test_federated_search_without_matches(catalog):
+    with pytest.raises(ValueError):
+        catalog.federated_search('zebra')
+
+
+def test_shows_with_missing_fields_are_shared():
+    frame = pd.DataFrame(SHOWS, columns = ['title', 'director', 'cast', 'country', 'type', 'date_added', 'rating', 'duration', 'listed_in', 'description'])
+    frame['country'] = float('nan') # a float column, each row gives a different NaN object
+    catalog = Catalog()
+    netflix = catalog.add_service('Netflix', frame)
+    hulu = catalog.add_service('Hulu', frame.copy())
+    for title in frame['title']:
+        assert netflix.get_show(title) is hulu.get_show(title)
+
+
+def test_unhashable_fields_are_not_shared():
+    row = dict(zip(['title', 'director', 'cast', 'country', 'show_type', 'year_added', 'rating', 'duration', 'genre', 'description'], SHOWS[0]))
+    row['cast'] = ['Bob Cy', 'Ann Lee']
+    catalog = Catalog()
+    netflix = catalog.add_service('Netflix', [row])
+    hulu = catalog.add_service('Hulu', [row])
+    assert netflix.search('bob').total() == 1
+    assert netflix.get_show('Chess Master') is not hulu.get_show('Chess Master')
+
+
+def test_catalog_services_can_be_pickled():
+    catalog = Catalog()
+    catalog.add_service('Netflix', SHOWS)
+    catalog.add_service('Hulu', SHOWS[:2])
+    netflix = pickle.loads(pickle.dumps(catalog.get_service('Netflix')))
+    assert [show.get_title() for show in netflix.search('chess')] == ['Chess Master', 'Drama Queen', 'Space Chess']
+    restored = pickle.loads(pickle.dumps(catalog))
+    assert restored.get_service('Netflix').get_show('Chess Master') is restored.get_service('Hulu').get_show('Chess Master')
+    restored.get_service('Hulu').add_show(*SHOWS[3])
+    assert restored.get_service('Hulu').get_show('Space Chess') is restored.get_service('Netflix').get_show('Space Chess')
@@ -0,0 +1,56 @@
+import pandas as pd
+import pytest
+
+from conftest import SHOWS
+from streaming_service import SHOW_FIELDS, StreamingService
+
+
+def _titles(service):
+    return sorted(show.get_title() for show in service.get_all_shows())
+
+
+def test_frame_columns_matched_by_name():
+    netflix_columns = ['show_id', 'type', 'title', 'director', 'cast', 'country', 'date_added', 'release_year', 'rating', 'duration', 'listed_in', 'description']
+    frame = pd.DataFrame([('s1', row[4], *row[:4], row[5], 2019, *row[6:]) for row in SHOWS], columns = netflix_columns)
+    service = StreamingService('Netflix', frame)
+    assert _titles(service) == sorted(row[0] for row in SHOWS)
+    assert service.get_show('Time Travel Dad').get_show_type() == 'TV Show'
+
+
+def test_frame_columns_taken_in_order_when_names_differ():
+    frame = pd.DataFrame(SHOWS, columns = [f'column {number}' for number in range(10)])
+    service = StreamingService('Netflix', frame)
+    assert service.get_show('Space Chess').get_duration() == '80 min'
+
+
+def test_frame_missing_columns():
+    frame = pd.DataFrame(SHOWS, columns = SHOW_FIELDS).drop(columns = ['cast'])
+    with pytest.raises(ValueError):
+        StreamingService('Netflix', frame)
+
+
+def test_ingest_csv_chunks(tmp_path):
+    path = tmp_path / 'netflix_titles.csv'
+    pd.DataFrame(SHOWS, columns = ['title', 'director', 'cast', 'country', 'type', 'date_added', 'rating', 'duration', 'listed_in', 'description']).to_csv(path, index = False)
+    service = StreamingService('Netflix', pd.read_csv(path, chunksize = 3))
+    assert _titles(service) == sorted(row[0] for row in SHOWS)
+    assert service.snapshot().get_generation() == 1 # one generation for the whole ingest
+    assert [show.get_title() for show in service.search('chess')] == ['Chess Master', 'Drama Queen', 'Space Chess']
+
+
+def test_ingest_dicts_and_tuples():
+    dicts = [dict(zip(['title', 'director', 'cast', 'country', 'type', 'date_added', 'rating', 'duration', 'listed_in', 'description', 'show_id'], row + ('s1',))) for row in SHOWS[:2]]
+    service = StreamingService('Netflix', iter(dicts))
+    service.ingest(tuple(row) for row in SHOWS[2:])
+    assert _titles(service) == sorted(row[0] for row in SHOWS)
+    assert service.get_show('Time Travel Dad').get_year_added() == 'May 1, 2020'
+    assert service.search('chess').total() == 3
+
+
+def test_failed_ingest_publishes_nothing():
+    service = StreamingService('Netflix', SHOWS[:1])
+    with pytest.raises(TypeError):
+        service.ingest([SHOWS[1], ('Too short',)])
+    assert _titles(service) == ['Chess Master']
+    with pytest.raises(ValueError):
+        service.search('dad')
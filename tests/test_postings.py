@@ -0,0 +1,81 @@
+import pickle
+import random
+
+import pytest
+
+from postings import CompressedPostings, PostingList, intersect
+
+
+def _postings(count, seed, duplicates = True):
+    '''
+    returns count sorted ids, with some ids repeated as when a term is in several fields of a show
+    '''
+    rng = random.Random(seed)
+    identities = []
+    identity = 0
+    while len(identities) < count:
+        identity += rng.randint(1, 300) # some gaps need more than one varint byte
+        identities.append(identity)
+        if duplicates and rng.random() < 0.3:
+            identities.append(identity)
+    return identities[:count]
+
+
+@pytest.mark.parametrize('count', [0, 1, 3, 4, 5, 8, 9, 100])
+def test_compressed_round_trip(count):
+    identities = _postings(count, count)
+    postings = CompressedPostings(identities, block_size = 4)
+    assert list(postings) == identities
+    assert len(postings) == count
+    assert list(pickle.loads(pickle.dumps(postings))) == identities
+
+
+def test_compressed_keeps_duplicates_across_block_boundaries():
+    identities = [1, 1, 2, 2, 2, 2, 3, 7, 7, 7, 7, 7, 9]
+    postings = CompressedPostings(identities, block_size = 4)
+    assert list(postings) == identities
+    assert postings.intersection([1, 2, 3, 7, 8, 9]) == [1, 2, 3, 7, 9]
+
+
+def test_compressed_rejects_decreasing_ids():
+    postings = CompressedPostings([1, 5], block_size = 4)
+    with pytest.raises(ValueError):
+        postings.append(4)
+
+
+def test_compressed_contains():
+    identities = _postings(50, 1)
+    postings = CompressedPostings(identities, block_size = 4)
+    for identity in range(identities[-1] + 2):
+        assert (identity in postings) == (identity in identities)
+
+
+@pytest.mark.parametrize('block_size', [1, 2, 4, 128])
+def test_intersect_matches_sets(block_size):
+    base = _postings(400, 0)
+    lists = [base, [identity for identity in base if identity % 2 == 0], [identity for identity in base if identity % 3 != 0],
+             sorted(base[::5] + _postings(50, 1))]
+    expected = sorted(set(lists[0]).intersection(*lists[1:]))
+    assert expected # the lists share some ids
+    compressed = [CompressedPostings(identities, block_size) for identities in lists]
+    assert intersect(compressed) == expected
+    assert intersect([compressed[0], lists[1], PostingList(lists[2]), compressed[3]]) == expected
+
+
+def test_intersect_without_common_ids():
+    assert intersect([CompressedPostings([1, 2, 3], 2), CompressedPostings([4, 5, 6], 2)]) == []
+
+
+@pytest.mark.parametrize('factory', [PostingList, lambda identities: CompressedPostings(identities, block_size = 4)])
+def test_copies_do_not_change_each_other(factory):
+    original = factory([1, 2, 3, 5, 8, 13])
+    first = original.copy()
+    second = original.copy()
+    first.extend([20, 21, 22, 23])
+    second.extend([30, 31])
+    assert list(original) == [1, 2, 3, 5, 8, 13]
+    assert list(first) == [1, 2, 3, 5, 8, 13, 20, 21, 22, 23]
+    assert list(second) == [1, 2, 3, 5, 8, 13, 30, 31]
+    original.append(40)
+    assert list(first) == [1, 2, 3, 5, 8, 13, 20, 21, 22, 23]
+    assert list(original) == [1, 2, 3, 5, 8, 13, 40]
@@ -0,0 +1,83 @@
+import pytest
+
+import streaming_service
+from conftest import SHOW, SHOWS
+from streaming_service import StreamingService
+
+
+@pytest.fixture
+def service():
+    service = StreamingService('Netflix')
+    service.ingest(SHOWS)
+    service.ingest((f'Chess {number}', *SHOW[1:]) for number in range(20))
+    return service
+
+
+def _titles(shows):
+    return [show.get_title() for show in shows]
+
+
+def test_page(service):
+    results = service.search('chess')
+    assert results.total() == len(results) == 23
+    assert _titles(results.page(0, 2)) == ['Chess Master', 'Drama Queen']
+    assert _titles(results.page(21, 5)) == ['Chess 18', 'Chess 19']
+    assert results.page(30) == []
+    assert _titles(results[1:3]) == _titles(results.page(1, 2))
+    assert results[0].get_title() == 'Chess Master'
+    with pytest.raises(ValueError):
+        results.page(-1)
+    with pytest.raises(ValueError):
+        results.page(0, 0)
+
+
+def test_search_page_follows_cursors(service):
+    results = service.search('chess')
+    titles = []
+    cursor = results.cursor(0)
+    while cursor is not None:
+        shows, cursor = service.search_page(cursor, 10)
+        titles.extend(_titles(shows))
+    assert titles == _titles(results)
+
+
+def test_search_page_reads_generation_of_cursor(service):
+    cursor = service.search('chess').cursor(0)
+    service.remove_show('Chess Master')
+    service.add_show('Chess Extra', *SHOW[1:])
+    shows, _ = service.search_page(cursor, 1)
+    assert _titles(shows) == ['Chess Master']
+    assert 'Chess Master' not in _titles(service.search('chess'))
+
+
+def test_removed_shows_are_not_counted(service):
+    service.remove_show('Drama Queen')
+    results = service.search('chess drama', unsure = True)
+    assert 'Drama Queen' not in _titles(results)
+    assert results.total() == 22
+
+
+def test_ranking_is_cached(service, monkeypatch):
+    results = service.search('chess')
+    monkeypatch.setattr(streaming_service, 'rank_postings', None) # fails if the shows are ranked again
+    shows, _ = service.search_page(results.cursor(5), 2)
+    assert _titles(shows) == _titles(results.page(5, 2))
+
+
+def test_old_cursors_expire(service, monkeypatch):
+    monkeypatch.setattr(streaming_service, 'REPLACED_GENERATIONS', 2)
+    kept = service.search('chess')
+    cursor = service.search('chess').cursor(0)
+    for number in range(3):
+        service.add_show(f'New {number}', *SHOW[1:])
+    assert _titles(service.search_page(kept.cursor(0), 1)[0]) == ['Chess Master'] # kept alive by the results
+    del kept
+    monkeypatch.setattr(streaming_service, 'CURSOR_LIFETIME', -1)
+    service.add_show('Newest', *SHOW[1:])
+    with pytest.raises(ValueError):
+        service.search_page(cursor)
+
+
+def test_invalid_cursor(service):
+    with pytest.raises(ValueError):
+        service.search_page('not a cursor')
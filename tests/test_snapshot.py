@@ -0,0 +1,107 @@
+import pickle
+import threading
+
+import pytest
+
+from conftest import SHOW
+from inv_index import InvertedIndex
+from layered_map import LayeredMap
+from show import Show
+from snapshot import CatalogSnapshot
+from streaming_service import StreamingService
+
+
+def _add(snapshot, title, year):
+    identity = snapshot.add_show(Show(title, *SHOW[1:5], year, *SHOW[6:]))
+    snapshot.get_inv_index().add_numeric(year, identity)
+    return identity
+
+
+def test_layered_map_child_does_not_change_parent():
+    parent = LayeredMap({'a': 1, 'b': 2})
+    child = parent.child()
+    child['c'] = 3
+    child['a'] = 10
+    del child['b']
+    assert dict(parent.items()) == {'a': 1, 'b': 2}
+    assert dict(child.items()) == {'a': 10, 'c': 3}
+    assert len(child) == 2 and 'b' not in child
+    child.compact()
+    assert dict(child.items()) == {'a': 10, 'c': 3}
+    assert dict(pickle.loads(pickle.dumps(child)).items()) == {'a': 10, 'c': 3}
+
+
+def test_published_generation_is_not_changed_by_the_next():
+    published = CatalogSnapshot(inv_index = InvertedIndex())
+    for number in range(10):
+        _add(published, f'Show {number}', 2019)
+    published.freeze()
+    before = list(published.get_inv_index().postings('2019'))
+
+    pending = published.copy()
+    _add(pending, 'New', 2019)
+    _add(pending, 'Newer', 2020)
+    pending.remove_show('Show 3')
+
+    assert pending.get_generation() == published.get_generation() + 1
+    assert list(published.get_inv_index().postings('2019')) == before
+    with pytest.raises(KeyError):
+        published.get_inv_index().postings('2020')
+    assert 'New' not in published.get_shows() and len(published.get_identities()) == 10
+    assert published.is_available(3) and not pending.is_available(3)
+    assert 3 in published.get_identities() and 3 not in pending.get_identities() # the removed show can be freed
+    with pytest.raises(KeyError):
+        pending.remove_show('Show 3')
+    assert list(pending.get_inv_index().postings('2019')) == before + [10]
+
+
+def test_compressed_generation_is_not_changed_by_the_next():
+    inv_index = InvertedIndex()
+    inv_index.compress(block_size = 4)
+    published = CatalogSnapshot(inv_index = inv_index)
+    for number in range(6):
+        _add(published, f'Show {number}', 2019)
+    first = published.copy()
+    second = published.copy() # an aborted batch and the one after it both copy the same generation
+    for number in range(3):
+        _add(first, f'First {number}', 2019)
+    _add(second, 'Second', 2019)
+    assert list(published.get_inv_index().postings('2019')) == [0, 1, 2, 3, 4, 5]
+    assert list(first.get_inv_index().postings('2019')) == [0, 1, 2, 3, 4, 5, 6, 7, 8]
+    assert list(second.get_inv_index().postings('2019')) == [0, 1, 2, 3, 4, 5, 6]
+
+
+def test_search_sees_published_generation_during_batch():
+    service = StreamingService('Netflix')
+    service.add_show(*SHOW)
+    adding = threading.Event()
+    searched = threading.Event()
+    found = []
+
+    def search():
+        adding.wait()
+        found.append([show.get_title() for show in service.search('chess')])
+        searched.set()
+
+    reader = threading.Thread(target = search)
+    reader.start()
+    with service.batch():
+        service.add_show('Chess Two', *SHOW[1:])
+        service.remove_show('Chess Master')
+        adding.set()
+        searched.wait(5) # readers do not wait for the writer
+    reader.join()
+    assert found == [['Chess Master']]
+    assert [show.get_title() for show in service.search('chess')] == ['Chess Two']
+
+
+def test_failed_batch_publishes_nothing():
+    service = StreamingService('Netflix')
+    service.add_show(*SHOW)
+    generation = service.snapshot().get_generation()
+    with pytest.raises(RuntimeError):
+        with service.batch():
+            service.add_show('Chess Two', *SHOW[1:])
+            raise RuntimeError
+    assert service.snapshot().get_generation() == generation
+    assert [show.get_title() for show in service.search('chess')] == ['Chess Master']
@@ -0,0 +1,65 @@
+import pandas as pd
+import pytest
+
+from conftest import SHOWS
+from streaming_service import StreamingService
+
+
+@pytest.fixture
+def service():
+    return StreamingService('Netflix', SHOWS)
+
+
+def test_term_counts_by_year(service):
+    counts = service.term_counts()
+    assert counts[(2020, 'chess')] == 1
+    assert counts[(2021, 'chess')] == 1
+    assert service.term_counts() is counts # kept for the generation
+    assert service.top_terms(2020, 1)[0][1] == 2 # 'united' and 'states' are in both shows of 2020
+
+
+def test_term_counts_by_type(service):
+    assert service.term_counts('type')[('Movie', 'chess')] == 3
+    assert service.top_terms('TV Show', 1, by = 'type')[0][1] == 1
+
+
+def test_term_counts_by_series(service):
+    release_year = pd.Series([1975, 2005, 2008, 2021])
+    by = pd.cut(release_year, [0, 1980, 2010, 2030]).reset_index(drop = True)
+    counts = service.term_counts(by)
+    assert counts[(by[1], 'chess')] == 1
+    assert counts[(by[3], 'chess')] == 1
+    assert dict(service.top_terms(by[0], 100, by = by))['chess'] == 1
+
+
+def test_term_counts_by_dict(service):
+    counts = service.term_counts({0: 'old', 1: 'old', 2: 'new'})
+    assert counts[('old', 'chess')] == 1
+    assert counts[('new', 'chess')] == 1
+    assert 'new' not in service.term_counts({0: 'old'}).index.get_level_values('bucket')
+
+
+def test_term_counts_leave_out_removed_shows(service):
+    service.remove_show('Drama Queen')
+    assert service.term_counts('type')[('Movie', 'chess')] == 2
+    with pytest.raises(KeyError):
+        service.top_terms(2020, by = {2: 2020})
+
+
+def test_term_counts_reject_unknown_bucketing(service):
+    with pytest.raises(ValueError):
+        service.term_counts('month')
+
+
+def test_statistics_leave_out_removed_and_replaced_shows(service):
+    assert service.document_frequency('chess') == 3
+    assert service.collection_frequency('chess') == 5 # the title and description of two shows
+    service.remove_show('Space Chess')
+    service.add_show(*SHOWS[0]) # replaces the show with the same title
+    assert service.document_frequency('chess') == 2
+    assert service.collection_frequency('chess') == 3
+    statistics = service.term_statistics()
+    assert statistics.loc['chess'].tolist() == [2, 3]
+    assert 'space' not in statistics.index
+    assert service.document_frequency('space') == 0
+    assert service.snapshot().get_inv_index().document_frequency('chess') == 4 # the index itself counts every posting
@@ -0,0 +1,139 @@
+import os
+import pickle
+
+import pytest
+
+from conftest import SHOW
+from durable_service import CHECKPOINT_FILE, LOG_FILE, DurableStreamingService
+from inv_index import InvertedIndex
+from snapshot import CatalogSnapshot
+from wal import WriteAheadLog
+
+
+def _write_log(path, records):
+    log = WriteAheadLog(path)
+    for record in records:
+        log.append(record)
+    log.close()
+    return os.path.getsize(path)
+
+
+def test_log_round_trip(tmp_path):
+    path = str(tmp_path / LOG_FILE)
+    _write_log(path, [(1, 'a'), (2, ['b', 'c'])])
+    assert WriteAheadLog(path).records() == [(1, 'a'), (2, ['b', 'c'])]
+
+
+@pytest.mark.parametrize('cut', [1, 5, 8, 12])
+def test_log_truncates_torn_record(tmp_path, cut):
+    path = str(tmp_path / LOG_FILE)
+    size = _write_log(path, [(1, 'a'), (2, 'b')])
+    _write_log(path + '.one', [(1, 'a')])
+    with open(path, 'r+b') as log: # as if the crash happened while the last record was written
+        log.truncate(size - cut)
+    assert WriteAheadLog(path).records() == [(1, 'a')]
+    assert os.path.getsize(path) == os.path.getsize(path + '.one')
+
+
+def test_log_truncates_corrupt_tail(tmp_path):
+    path = str(tmp_path / LOG_FILE)
+    size = _write_log(path, [(1, 'a'), (2, 'b'), (3, 'c')])
+    with open(path, 'r+b') as log:
+        log.seek(size - 1)
+        log.write(b'\xff')
+    with open(path, 'ab') as log:
+        log.write(b'\x00\x00\x01\x00garbage')
+    log = WriteAheadLog(path)
+    assert log.records() == [(1, 'a'), (2, 'b')]
+    log.append((4, 'd'))
+    log.close()
+    assert WriteAheadLog(path).records() == [(1, 'a'), (2, 'b'), (4, 'd')]
+
+
+def test_log_reset(tmp_path):
+    path = str(tmp_path / LOG_FILE)
+    log = WriteAheadLog(path)
+    log.append((1, 'a'))
+    log.reset()
+    log.append((2, 'b'))
+    log.close()
+    assert WriteAheadLog(path).records() == [(2, 'b')]
+
+
+def test_log_rejects_sync_every(tmp_path):
+    with pytest.raises(ValueError):
+        WriteAheadLog(str(tmp_path / LOG_FILE), sync_every = 0)
+
+
+def test_replay_skips_sequences_in_checkpoint(tmp_path):
+    state = {'sequence': 2, 'next_show_id': 0, 'snapshot': CatalogSnapshot(inv_index = InvertedIndex())}
+    with open(tmp_path / CHECKPOINT_FILE, 'wb') as checkpoint:
+        pickle.dump(state, checkpoint)
+    # a crash after the checkpoint was renamed but before the log was reset leaves records it already holds
+    _write_log(str(tmp_path / LOG_FILE), [(1, [('not_an_operation', ())]), (2, [('not_an_operation', ())])])
+    service = DurableStreamingService('Netflix', str(tmp_path))
+    assert service.snapshot().get_generation() == 0
+    assert len(service.get_all_shows()) == 0
+    service.close()
+
+
+def test_replay_after_crash(tmp_path):
+    service = DurableStreamingService('Netflix', str(tmp_path), checkpoint_every = 4) # the last two changes are only in the log
+    service.add_show(*SHOW)
+    for number in range(4):
+        service.add_show(f'Chess {number}', *SHOW[1:])
+    service.remove_show('Chess 0')
+    expected = [str(show) for show in service.search('chess')]
+    service._log.sync() # crash without close
+    restored = DurableStreamingService('Netflix', str(tmp_path))
+    assert [str(show) for show in restored.search('chess')] == expected
+    assert restored.search('chess').total() == 4
+    restored.close()
+
+
+class _FailingFile:
+    '''
+    Writes half of what it is given and fails, like a full disk. truncate fails too when broken is set
+    '''
+
+    def __init__(self, file, broken = False):
+        self._file = file
+        self._broken = broken
+
+    def write(self, data):
+        self._file.write(data[:len(data) // 2])
+        raise OSError('No space left on device')
+
+    def truncate(self, size):
+        if self._broken:
+            raise OSError('Input/output error')
+        return self._file.truncate(size)
+
+
+def test_log_cuts_off_failed_append(tmp_path):
+    path = str(tmp_path / LOG_FILE)
+    log = WriteAheadLog(path)
+    log.append((1, 'a'))
+    working = log._file
+    log._file = _FailingFile(working)
+    with pytest.raises(OSError):
+        log.append((2, 'b' * 100))
+    log._file = working
+    log.append((3, 'c'))
+    log.close()
+    assert WriteAheadLog(path).records() == [(1, 'a'), (3, 'c')]
+
+
+def test_log_refuses_appends_after_failed_cut(tmp_path):
+    path = str(tmp_path / LOG_FILE)
+    log = WriteAheadLog(path)
+    log.append((1, 'a'))
+    working = log._file
+    log._file = _FailingFile(working, broken = True)
+    with pytest.raises(OSError):
+        log.append((2, 'b' * 100))
+    log._file = working
+    with pytest.raises(OSError):
+        log.append((3, 'c'))
+    log.close()
+    assert WriteAheadLog(path).records() == [(1, 'a')]